@@ -1,6 +1,30 @@
+import argparse
 import pygame
-import math
 import sys
+from math import sqrt
+from collections import defaultdict
+
+import numpy as np
+
+try:
+    from numba import njit, prange, get_num_threads
+except ImportError:  # Numba is optional; gravity falls back to the Cython kernels or plain NumPy
+    njit = None
+
+try:
+    from numba import cuda, float32
+except ImportError:  # GPU gravity needs Numba's CUDA support
+    cuda = None
+
+try:
+    from pygame._sdl2.video import Window, Renderer, Texture
+except ImportError:  # Older pygame; draw with surfaces only
+    Renderer = None
+
+try:
+    import planets_kernel  # Cython kernels, built with: python setup.py build_ext --inplace
+except ImportError:
+    planets_kernel = None
 
 # Initialize PyGame
 pygame.init()
@@ -15,10 +39,19 @@ TIME_STEP = 1  # Time step for movement calculations
 MIN_RADIUS = 5  # Minimum planet radius
 DAMPING_FACTOR = 0.2  # Slows large planet near center
 CENTER_THRESHOLD = 10  # Distance threshold to stop center gravity
-
-# Set up the display
-screen = pygame.display.set_mode((WIDTH, HEIGHT))  # Screen size
-pygame.display.set_caption("Planetary Simulation")  # Window title
+BARNES_HUT_THRESHOLD = 1000  # Planet count above which gravity uses the quadtree
+BARNES_HUT_THETA = 0.5  # Opening angle; larger is faster but less accurate
+QUADTREE_MAX_DEPTH = 24  # Stop subdividing so overlapping planets share a leaf
+GPU_MIN_PLANETS = 256  # Below this, copying to the GPU costs more than it saves
+GPU_TILE = 128  # Planets per shared-memory tile (threads per block) in the GPU kernel
+
+# Planet flag bits
+COLLIDABLE = 1  # Collides and merges with other planets
+LARGEST = 2  # Largest planet created so far
+ATTRACTS = 4  # Pulls on other planets
+FIXED = 8  # Never moves
+
+# Frame timing and drawing helpers (the window itself is created in main)
 clock = pygame.time.Clock()  # Used to limit frame rate
 
 # Function for color gradient
@@ -30,8 +63,110 @@ def get_color_from_radius(radius):
     b = int(128 - factor * 128)  # Blue color component
     return (r, g, b)  # Return color as RGB tuple
 
+class PlanetPool:
+    # Struct-of-arrays storage for every planet. Planet objects are thin views
+    # holding an index, so physics passes can work on whole array slices.
+    # float32 is plenty for a screen-sized 2D simulation and doubles the SIMD
+    # width of the gravity kernels; sums are still accumulated in float64.
+    FIELDS = {
+        'x': (np.float32, ()),  # X positions
+        'y': (np.float32, ()),  # Y positions
+        'vx': (np.float32, ()),  # X velocities
+        'vy': (np.float32, ()),  # Y velocities
+        'ax': (np.float32, ()),  # X accelerations
+        'ay': (np.float32, ()),  # Y accelerations
+        'mass': (np.float32, ()),  # Masses
+        'radius': (np.int32, ()),  # Radii
+        'color': (np.uint8, (3,)),  # RGB colors
+        'flags': (np.uint8, ()),  # Planet flag bits
+        'removed': (np.bool_, ()),  # Marked for removal by the collision pass
+    }
+
+    def __init__(self, capacity=1024):
+        self.n_active = 0  # Number of slots in use
+        self.planets = []  # Planet view for each active slot
+        for name, (dtype, shape) in self.FIELDS.items():
+            setattr(self, name, np.zeros((capacity,) + shape, dtype=dtype))
+
+    def __len__(self):
+        return self.n_active
+
+    def __getitem__(self, i):
+        return self.planets[i]
+
+    def add(self, planet):
+        n = self.n_active
+        if n == self.x.shape[0]:  # Full: double every array
+            for name in self.FIELDS:
+                old = getattr(self, name)
+                new = np.zeros((2 * n,) + old.shape[1:], dtype=old.dtype)
+                new[:n] = old
+                setattr(self, name, new)
+
+        self.removed[n] = False
+        self.planets.append(planet)
+        self.n_active += 1
+        return n
+
+    def compact(self):
+        # Drop every planet marked in removed in one O(N) pass, keeping the others in order
+        n = self.n_active
+        if not self.removed[:n].any():  # Nothing to do (and nothing allocated) on most frames
+            return
+        keep = ~self.removed[:n]
+        n_kept = int(keep.sum())
+        for name in self.FIELDS:  # Compact every column
+            arr = getattr(self, name)
+            arr[:n_kept] = arr[:n][keep]
+
+        kept = []
+        for planet, stays in zip(self.planets, keep.tolist()):
+            if stays:
+                planet.index = len(kept)
+                kept.append(planet)
+            else:
+                planet.index = -1  # The view no longer points at a planet
+        self.planets = kept
+        self.n_active = n_kept
+        self.removed[:n_kept] = False
+
+    def clear(self):
+        for planet in self.planets:
+            planet.index = -1
+        self.planets.clear()
+        self.n_active = 0
+
+class PlanetField:
+    # Exposes one PlanetPool column as a plain attribute on a Planet view
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, planet, owner):
+        if planet is None:
+            return self
+        return getattr(planet_pool, self.name)[planet.index].tolist()
+
+    def __set__(self, planet, value):
+        getattr(planet_pool, self.name)[planet.index] = value
+
+planet_pool = PlanetPool()  # Every planet in the simulation
+
 class Planet:
+    __slots__ = ('index',)
+
+    x = PlanetField('x')  # Planet x position
+    y = PlanetField('y')  # Planet y position
+    vx = PlanetField('vx')  # Planet's velocity in x direction
+    vy = PlanetField('vy')  # Planet's velocity in y direction
+    ax = PlanetField('ax')  # Planet's acceleration in x direction
+    ay = PlanetField('ay')  # Planet's acceleration in y direction
+    mass = PlanetField('mass')  # Planet's mass
+    radius = PlanetField('radius')  # Planet's radius
+    color = PlanetField('color')  # Planet's color
+    flags = PlanetField('flags')  # Planet flag bits
+
     def __init__(self, x, y, radius, vx=0, vy=0):
+        self.index = planet_pool.add(self)  # Slot in the planet pool
         self.x = x  # Planet x position
         self.y = y  # Planet y position
         self.radius = radius  # Planet's radius
@@ -41,51 +176,22 @@ class Planet:
         self.ax = 0  # Planet's acceleration in x direction
         self.ay = 0  # Planet's acceleration in y direction
         self.color = get_color_from_radius(self.radius)  # Color based on radius
-        self.is_largest = False  # Flag if it's the largest planet
-        self.is_collidable = True  # Flag for collision detection
-
-    def apply_gravity(self, other):
-        # Check if the other planet is a ghost; skip if true
-        if isinstance(other, GhostPlanet):
-            return  # Normal planets should not be affected by ghost planets
-
-        if other.is_collidable:  # Continue if the other planet is collidable
-            dx = other.x - self.x  # X distance to other planet
-            dy = other.y - self.y  # Y distance to other planet
-            distance = math.sqrt(dx ** 2 + dy ** 2) + 1e-2  # Distance between planets
-
-            force = GRAVITATIONAL_CONSTANT * self.mass * other.mass / distance ** 2  # Gravity force
-
-            ax = force * dx / (distance * self.mass)  # X acceleration
-            ay = force * dy / (distance * self.mass)  # Y acceleration
-
-            self.ax += ax  # Add to planet's total x acceleration
-            self.ay += ay  # Add to planet's total y acceleration
-
-    def update_position(self, dt):
-        self.vx += self.ax * dt  # Update x velocity
-        self.vy += self.ay * dt  # Update y velocity
-        self.x += self.vx * dt  # Update x position
-        self.y += self.vy * dt  # Update y position
-
-        self.ax = 0  # Reset x acceleration
-        self.ay = 0  # Reset y acceleration
+        self.flags = COLLIDABLE | ATTRACTS  # Collides and pulls, not the largest yet
 
     def check_collision(self, other):
         dx = other.x - self.x  # X distance between planets
         dy = other.y - self.y  # Y distance between planets
-        distance = math.sqrt(dx ** 2 + dy ** 2)  # Total distance
 
-        if distance < self.radius + other.radius:  # If colliding
+        if dx * dx + dy * dy < (self.radius + other.radius) ** 2:  # If colliding (squared, no sqrt)
             self.merge(other)  # Merge the two planets
             return True
         return False
 
     def merge(self, other):
-        if not self.is_collidable or not other.is_collidable:
+        if not self.flags & other.flags & COLLIDABLE:
             return
         
-        new_radius = math.sqrt(self.radius**2 + other.radius**2)  # New radius
+        new_radius = sqrt(self.radius**2 + other.radius**2)  # New radius
         new_mass = self.mass + other.mass  # Combined mass
 
         self.radius = int(new_radius)  # Set new radius
@@ -96,75 +202,450 @@ class Planet:
         self.vx = (self.vx * self.mass + other.vx * other.mass) / new_mass
         self.vy = (self.vy * self.mass + other.vy * other.mass) / new_mass
 
-    def draw(self, surface):
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.radius)  # Draw planet
-
 class NonCollidingPlanet(Planet):
+    __slots__ = ()
+
     def __init__(self, x, y, radius, vx=0, vy=0):
         super().__init__(x, y, radius, vx, vy)  # Inherit planet properties
-        self.is_collidable = False  # Set as non-collidable
+        self.flags = 0  # Set as non-collidable and massless to others
         self.color = (255, 255, 255)  # White color for non-collidable
 
     def check_collision(self, other):
         return False  # Never collide with other planets
 
 class GhostPlanet(NonCollidingPlanet):
+    __slots__ = ()
+
     def __init__(self, x, y, radius, vx=0, vy=0):
         super().__init__(x, y, radius, vx, vy)  # Inherit non-collidable
-        self.is_collidable = False  # Set as non-collidable
         self.color = (255, 255, 255)  # White color for ghost planets
 
-    def apply_gravity(self, other):
-        if not other.is_collidable:  # Skip gravity on non-collidable planets
-            return
-
-        dx = other.x - self.x  # X distance to other planet
-        dy = other.y - self.y  # Y distance to other planet
-        distance = math.sqrt(dx ** 2 + dy ** 2) + 1e-2  # Total distance
-
-        force = GRAVITATIONAL_CONSTANT * self.mass * other.mass / distance ** 2  # Gravity force
-
-        ax = force * dx / (distance * self.mass)  # X acceleration
-        ay = force * dy / (distance * self.mass)  # Y acceleration
-
-        self.ax += ax  # Add to x acceleration
-        self.ay += ay  # Add to y acceleration
-
 
 class Sun(Planet):
+    __slots__ = ()
+
     def __init__(self):
         # Initialize as a planet at the center with a large radius and zero initial velocity
         super().__init__(x=CENTER[0], y=CENTER[1], radius=40, vx=0, vy=0)
         self.color = (255, 223, 100)  # Bright yellow color for the sun
         self.mass = self.radius * MASS_MULTIPLIER * 100  # Larger mass for stronger gravity
-        self.is_collidable = False  # The sun does not collide with planets
-
-    def apply_gravity(self, other):
-        # Apply  gravitational force to other planets
-
-        dx = self.x - other.x
-        dy = self.y - other.y
-        distance = math.sqrt(dx ** 2 + dy ** 2) + 1e-2
-
-        # Double the gravitational force
-        force = GRAVITATIONAL_CONSTANT * self.mass * other.mass / distance ** 2
-
-        ax = force * dx / (distance * other.mass)
-        ay = force * dy / (distance * other.mass)
-
-        other.ax += ax
-        other.ay += ay
+        self.flags = ATTRACTS | FIXED  # The sun pulls on planets but never collides or moves
 
     def merge(self, other):
         return
 
-    def update_position(self, dt):
-        # Override position update to keep the Sun fixed at the center
-        self.x, self.y = CENTER
+if njit is not None:
+    BARNES_HUT_THRESHOLD = 16000  # The compiled direct sum stays faster than the tree for much longer
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def compute_accel(xs, ys, m, ax, ay, G, n_threads):
+        # Pull of every planet on every other, for planets that all pull. Each
+        # pair is visited once and applied to both planets (Newton's third law).
+        # Threads write the j side into their own row so they never race. The
+        # caller passes n_threads since reading it in here stops Numba caching.
+        n = xs.shape[0]
+        acc_x = np.zeros((n_threads, n))  # float64 accumulators avoid cancellation in large sums
+        acc_y = np.zeros((n_threads, n))
+        one = np.float32(1.0)
+        eps = np.float32(1e-4)  # Softening
+
+        for t in prange(n_threads):
+            for i in range(t, n, n_threads):  # Interleave rows so threads get similar work
+                xi = xs[i]
+                yi = ys[i]
+                m_i = m[i]
+                axi = 0.0
+                ayi = 0.0
+                for j in range(i + 1, n):
+                    dx = xs[j] - xi
+                    dy = ys[j] - yi
+                    inv_r = one / np.sqrt(dx * dx + dy * dy + eps)  # float32 math maps to rsqrtps
+                    inv_r3 = inv_r * inv_r * inv_r
+                    axi += m[j] * dx * inv_r3  # Pull of j on i
+                    ayi += m[j] * dy * inv_r3
+                    acc_x[t, j] -= m_i * dx * inv_r3  # Equal and opposite pull of i on j
+                    acc_y[t, j] -= m_i * dy * inv_r3
+                acc_x[t, i] += axi  # Store once per planet
+                acc_y[t, i] += ayi
+
+        for i in prange(n):  # Sum the per-thread rows
+            sum_x = 0.0
+            sum_y = 0.0
+            for t in range(n_threads):
+                sum_x += acc_x[t, i]
+                sum_y += acc_y[t, i]
+            ax[i] = G * sum_x
+            ay[i] = G * sum_y
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def compute_accel_from(tx, ty, xs, ys, m, ax, ay, G):
+        # Pull of the planets at xs, ys on targets that don't pull back
+        one = np.float32(1.0)
+        eps = np.float32(1e-4)  # Softening
+        for i in prange(tx.shape[0]):  # Each target planet runs on its own thread
+            xi = tx[i]
+            yi = ty[i]
+            axi = 0.0  # float64 accumulators
+            ayi = 0.0
+            for j in range(xs.shape[0]):
+                dx = xs[j] - xi
+                dy = ys[j] - yi
+                inv_r = one / np.sqrt(dx * dx + dy * dy + eps)
+                inv_r3 = inv_r * inv_r * inv_r
+                axi += m[j] * dx * inv_r3
+                ayi += m[j] * dy * inv_r3
+            ax[i] = G * axi  # Store once per planet
+            ay[i] = G * ayi
+
+    # Compile for the pool's float32 arrays at import so the first frame doesn't stall
+    f32 = np.float32
+    compute_accel(np.zeros(2, f32), np.ones(2, f32), np.ones(2, f32), np.empty(2, f32), np.empty(2, f32),
+                  float(GRAVITATIONAL_CONSTANT), get_num_threads())
+    compute_accel_from(np.zeros(2, f32), np.zeros(2, f32), np.ones(2, f32), np.ones(2, f32), np.ones(2, f32),
+                       np.empty(2, f32), np.empty(2, f32), float(GRAVITATIONAL_CONSTANT))
+
+elif planets_kernel is not None:  # The same kernels compiled ahead of time with Cython
+    BARNES_HUT_THRESHOLD = 16000
+    compute_accel = planets_kernel.compute_accel
+    compute_accel_from = planets_kernel.compute_accel_from
+
+else:
+    compute_accel = compute_accel_from = None  # Use the NumPy kernel
+
+def direct_accel(tx, ty, xs, ys, m):
+    # NumPy pull of the planets at xs, ys on the targets at tx, ty. Self pairs
+    # add nothing since their dx and dy are zero.
+    dx = xs[None, :] - tx[:, None]  # X distance from each target (row) to every planet (column)
+    dy = ys[None, :] - ty[:, None]  # Y distance from each target (row) to every planet (column)
+    r2 = dx * dx + dy * dy + 1e-4  # Softened squared distance
+
+    invr3 = r2 ** -1.5
+    invr3 *= m[None, :]  # Own mass cancels since a = F / m
+
+    ax = GRAVITATIONAL_CONSTANT * (dx * invr3).sum(axis=1, dtype=np.float64)  # X acceleration, summed in float64
+    ay = GRAVITATIONAL_CONSTANT * (dy * invr3).sum(axis=1, dtype=np.float64)  # Y acceleration
+    return ax, ay
+
+def compute_accelerations(xs, ys, masses, idx_pull, idx_passive):
+    # Planets flagged ATTRACTS pull on each other; the rest only feel their pull
+    ax, ay = np.empty_like(xs), np.empty_like(ys)
+    pull_x, pull_y, pull_m = xs[idx_pull], ys[idx_pull], masses[idx_pull]
+    passive_x, passive_y = xs[idx_passive], ys[idx_passive]
+
+    if compute_accel is not None:  # Compiled kernels (Numba or Cython)
+        G = float(GRAVITATIONAL_CONSTANT)
+        n_threads = get_num_threads() if njit is not None else 1  # The Cython kernel runs on one thread
+        pull_ax, pull_ay = np.empty_like(pull_x), np.empty_like(pull_y)
+        compute_accel(pull_x, pull_y, pull_m, pull_ax, pull_ay, G, n_threads)
+        passive_ax, passive_ay = np.empty_like(passive_x), np.empty_like(passive_y)
+        compute_accel_from(passive_x, passive_y, pull_x, pull_y, pull_m, passive_ax, passive_ay, G)
+    else:
+        pull_ax, pull_ay = direct_accel(pull_x, pull_y, pull_x, pull_y, pull_m)
+        passive_ax, passive_ay = direct_accel(passive_x, passive_y, pull_x, pull_y, pull_m)
+
+    ax[idx_pull], ay[idx_pull] = pull_ax, pull_ay
+    ax[idx_passive], ay[idx_passive] = passive_ax, passive_ay
+    return ax, ay
+
+if cuda is not None:
+    @cuda.jit(fastmath=True)
+    def gpu_accel_kernel(tx, ty, xs, ys, m, ax, ay, G):
+        # One thread per target planet. Each block loads the pulling planets
+        # one tile at a time into shared memory and every thread sums the tile.
+        tile_x = cuda.shared.array(GPU_TILE, float32)
+        tile_y = cuda.shared.array(GPU_TILE, float32)
+        tile_m = cuda.shared.array(GPU_TILE, float32)
+
+        i = cuda.grid(1)
+        t = cuda.threadIdx.x
+        active = i < tx.shape[0]
+        xi = tx[i] if active else float32(0)
+        yi = ty[i] if active else float32(0)
+        axi = float32(0)  # float32 sums; float64 is far slower on consumer GPUs
+        ayi = float32(0)
+
+        for start in range(0, xs.shape[0], GPU_TILE):
+            j = start + t
+            if j < xs.shape[0]:
+                tile_x[t] = xs[j]
+                tile_y[t] = ys[j]
+                tile_m[t] = m[j]
+            else:  # Pad the last tile with massless planets
+                tile_x[t] = 0
+                tile_y[t] = 0
+                tile_m[t] = 0
+            cuda.syncthreads()
+
+            for k in range(GPU_TILE):  # Self pairs add nothing since dx = dy = 0
+                dx = tile_x[k] - xi
+                dy = tile_y[k] - yi
+                inv_r = float32(1) / sqrt(dx * dx + dy * dy + float32(1e-4))
+                inv_r3 = inv_r * inv_r * inv_r
+                axi += tile_m[k] * dx * inv_r3
+                ayi += tile_m[k] * dy * inv_r3
+            cuda.syncthreads()
+
+        if active:
+            ax[i] = G * axi
+            ay[i] = G * ayi
+
+def gpu_available():
+    return cuda is not None and cuda.is_available()
+
+gpu_buffers = {}  # Device arrays reused every frame, keyed by name
+
+def gpu_buffer(name, n):
+    # Device array with room for n planets. It is sized to the pool's capacity
+    # and only reallocated when the pool grows past it.
+    buffer = gpu_buffers.get(name)
+    if buffer is None or buffer.shape[0] < n:
+        buffer = cuda.device_array(max(n, planet_pool.x.shape[0]), dtype=np.float32)
+        gpu_buffers[name] = buffer
+    return buffer[:n]
+
+def gpu_accelerations(xs, ys, masses, idx_pull):
+    # Pull of the ATTRACTS planets on every planet, computed on the GPU
+    n, n_pull = xs.shape[0], idx_pull.shape[0]
+    xs_d, ys_d = gpu_buffer('x', n), gpu_buffer('y', n)
+    pull_x_d, pull_y_d, pull_m_d = gpu_buffer('pull_x', n_pull), gpu_buffer('pull_y', n_pull), gpu_buffer('pull_m', n_pull)
+    ax_d, ay_d = gpu_buffer('ax', n), gpu_buffer('ay', n)
+    xs_d.copy_to_device(xs)
+    ys_d.copy_to_device(ys)
+    pull_x_d.copy_to_device(xs[idx_pull])
+    pull_y_d.copy_to_device(ys[idx_pull])
+    pull_m_d.copy_to_device(masses[idx_pull])
+
+    blocks = (n + GPU_TILE - 1) // GPU_TILE
+    gpu_accel_kernel[blocks, GPU_TILE](xs_d, ys_d, pull_x_d, pull_y_d, pull_m_d, ax_d, ay_d,
+                                       np.float32(GRAVITATIONAL_CONSTANT))
+    return ax_d.copy_to_host(), ay_d.copy_to_host()
+
+class QuadTree:
+    # Barnes-Hut quadtree stored as parallel node arrays. Node 0 is an empty
+    # sentinel (zero mass) so missing children can simply point at it.
+    ROOT = 1
+
+    def __init__(self, xs, ys, masses, sources, theta=BARNES_HUT_THETA):
+        self.theta = theta  # Opening angle for the far-field approximation
+        self.theta2 = theta * theta  # Squared so the walk can compare squared distances
+        self.build(xs, ys, masses, sources)
+
+    def build(self, xs, ys, masses, sources):
+        # Only the planets listed in sources (the ones flagged ATTRACTS) carry mass in the tree
+        leaf_of = np.full(xs.shape[0], -1, dtype=np.intp)  # Leaf holding each planet (-1 if not in the tree)
+
+        if sources.size:
+            min_x, max_x = xs[sources].min(), xs[sources].max()
+            min_y, max_y = ys[sources].min(), ys[sources].max()
+            root_width = max(max_x - min_x, max_y - min_y) + 1.0  # Square box around every source
+            root_cx, root_cy = (min_x + max_x) / 2, (min_y + max_y) / 2
+        else:
+            root_width, root_cx, root_cy = 1.0, 0.0, 0.0
+
+        cx, cy, width = [0.0, root_cx], [0.0, root_cy], [0.0, root_width]  # Node centers and side lengths
+        depth = [0, 0]  # Node depths
+        children = [[0, 0, 0, 0], [0, 0, 0, 0]]  # Child node per quadrant (0 means none)
+        particle = [-1, -1]  # Planet stored in a leaf (-1 if empty or internal)
+        internal = [False, False]  # Nodes that have been subdivided
+
+        def add_child(node, quadrant, i):
+            half = width[node] / 2
+            cx.append(cx[node] + (half / 2 if quadrant & 1 else -half / 2))
+            cy.append(cy[node] + (half / 2 if quadrant & 2 else -half / 2))
+            width.append(half)
+            depth.append(depth[node] + 1)
+            children.append([0, 0, 0, 0])
+            particle.append(i)
+            internal.append(False)
+            child = len(cx) - 1
+            children[node][quadrant] = child
+            leaf_of[i] = child
+
+        for i, x, y in zip(sources.tolist(), xs[sources].tolist(), ys[sources].tolist()):
+            node = self.ROOT
+            while True:
+                if internal[node]:  # Descend into the quadrant containing the planet
+                    quadrant = (x >= cx[node]) + 2 * (y >= cy[node])
+                    child = children[node][quadrant]
+                    if child == 0:
+                        add_child(node, quadrant, i)
+                        break
+                    node = child
+                elif particle[node] < 0:  # Empty leaf (only the root starts out empty)
+                    particle[node] = i
+                    leaf_of[i] = node
+                    break
+                elif depth[node] >= QUADTREE_MAX_DEPTH:  # Planets on top of each other share the leaf
+                    leaf_of[i] = node
+                    break
+                else:  # Split the leaf and push its planet down one level
+                    other = particle[node]
+                    particle[node] = -1
+                    internal[node] = True
+                    add_child(node, (xs[other] >= cx[node]) + 2 * (ys[other] >= cy[node]), other)
+
+        self.width = np.array(width)
+        self.children = np.array(children, dtype=np.intp)
+        self.internal = np.array(internal)
+        self.leaf_of = leaf_of
+
+        # Accumulate mass and center of mass from the leaves up to the root
+        n_nodes = len(cx)
+        in_tree = leaf_of[sources]
+        self.total_mass = np.bincount(in_tree, weights=masses[sources], minlength=n_nodes)
+        mass_x = np.bincount(in_tree, weights=masses[sources] * xs[sources], minlength=n_nodes)
+        mass_y = np.bincount(in_tree, weights=masses[sources] * ys[sources], minlength=n_nodes)
+
+        depth = np.array(depth)
+        for level in range(depth.max(), -1, -1):
+            nodes = np.flatnonzero((depth == level) & self.internal)
+            kids = self.children[nodes]
+            self.total_mass[nodes] = self.total_mass[kids].sum(axis=1)
+            mass_x[nodes] = mass_x[kids].sum(axis=1)
+            mass_y[nodes] = mass_y[kids].sum(axis=1)
+
+        safe_mass = np.where(self.total_mass > 0, self.total_mass, 1.0)  # The sentinel has no mass
+        self.com_x = mass_x / safe_mass
+        self.com_y = mass_y / safe_mass
+
+    def compute_accel(self, xs, ys, ax_out, ay_out):
+        # Walk the tree for every planet at once: each entry on the stack is a
+        # (planet, node) pair that is either accepted or replaced by its children.
+        n = xs.shape[0]
+        ax_out[:] = 0
+        ay_out[:] = 0
+        if self.total_mass[self.ROOT] == 0:
+            return
+
+        targets = np.arange(n)
+        nodes = np.full(n, self.ROOT, dtype=np.intp)
+        while targets.size:
+            dx = self.com_x[nodes] - xs[targets]  # X distance to the node's center of mass
+            dy = self.com_y[nodes] - ys[targets]  # Y distance to the node's center of mass
+            d2 = dx * dx + dy * dy
+
+            width = self.width[nodes]
+            far = width * width < self.theta2 * d2  # Node looks small enough from here (w / d < theta)
+            accept = far | ~self.internal[nodes]
+            use = accept & (nodes != self.leaf_of[targets])  # A planet never pulls on itself
+
+            invr3 = self.total_mass[nodes[use]] * (d2[use] + 1e-4) ** -1.5
+            ax_out += np.bincount(targets[use], weights=dx[use] * invr3, minlength=n)
+            ay_out += np.bincount(targets[use], weights=dy[use] * invr3, minlength=n)
+
+            opened = ~accept
+            kids = self.children[nodes[opened]].ravel()
+            present = kids != 0
+            targets = np.repeat(targets[opened], 4)[present]
+            nodes = kids[present]
+
+        ax_out *= GRAVITATIONAL_CONSTANT
+        ay_out *= GRAVITATIONAL_CONSTANT
+
+def step_planets(pool, dt, use_gpu=False):
+    n = len(pool)
+    xs, ys = pool.x[:n], pool.y[:n]  # Views into the pool, updated in place
+    vxs, vys = pool.vx[:n], pool.vy[:n]
+    ax, ay = pool.ax[:n], pool.ay[:n]
+    attracts = (pool.flags[:n] & ATTRACTS) != 0  # Planets that pull on the others (the Sun pulls without colliding)
+    fixed = (pool.flags[:n] & FIXED) != 0  # Planets pinned in place (the Sun)
+    idx_pull = np.flatnonzero(attracts)  # Split once so the kernels never test flags
+    idx_passive = np.flatnonzero(~attracts)
+
+    # Velocity Verlet: drift with last step's acceleration, then kick with the
+    # average of the old and new acceleration
+    ax_prev, ay_prev = ax.copy(), ay.copy()
+    xs += (vxs + 0.5 * ax_prev * dt) * dt  # Update positions
+    ys += (vys + 0.5 * ay_prev * dt) * dt
+
+    if use_gpu and n >= GPU_MIN_PLANETS:  # Direct sum on the GPU
+        ax[:], ay[:] = gpu_accelerations(xs, ys, pool.mass[:n], idx_pull)
+    elif n > BARNES_HUT_THRESHOLD:  # Approximate distant clusters for large counts
+        QuadTree(xs, ys, pool.mass[:n], idx_pull).compute_accel(xs, ys, ax, ay)
+    else:
+        ax[:], ay[:] = compute_accelerations(xs, ys, pool.mass[:n], idx_pull, idx_passive)
+    ax[fixed] = 0  # Fixed planets never move
+    ay[fixed] = 0
+
+    vxs += 0.5 * (ax_prev + ax) * dt  # Update velocities
+    vys += 0.5 * (ay_prev + ay) * dt
+
+def collision_pairs(pool):
+    # Spatial hash broad phase: with cells twice the largest radius, touching
+    # planets are always in the same or a neighbouring cell
+    n = len(pool)
+    if not n:
+        return
+    cell = 2 * int(pool.radius[:n].max())
+
+    cells = list(zip((pool.x[:n] // cell).astype(np.int64).tolist(),
+                     (pool.y[:n] // cell).astype(np.int64).tolist()))  # Cell of each planet
+    grid = defaultdict(list)  # Planet indices per cell
+    for i, key in enumerate(cells):
+        grid[key].append(i)
+
+    for i, (cell_x, cell_y) in enumerate(cells):
+        nearby = sorted(j for nx in (cell_x - 1, cell_x, cell_x + 1)
+                        for ny in (cell_y - 1, cell_y, cell_y + 1)
+                        for j in grid.get((nx, ny), ()) if j > i)  # Same pair order as a full scan
+        for j in nearby:
+            yield i, j
+
+def visible_planets(pool):
+    # (color, x, y, radius) of every on-screen planet, read from the pool arrays in one go
+    n = len(pool)
+    xs = pool.x[:n].astype(np.int64)
+    ys = pool.y[:n].astype(np.int64)
+    radii = pool.radius[:n]
+    visible = (xs + radii >= 0) & (xs - radii < WIDTH) & (ys + radii >= 0) & (ys - radii < HEIGHT)  # Skip off-screen planets
+    return zip(pool.color[:n][visible].tolist(), xs[visible].tolist(), ys[visible].tolist(), radii[visible].tolist())
+
+def draw_planets(surface, pool):
+    # Draw every visible planet and collect the screen area it covers in the
+    # same pass, so the arrays are read once per frame
+    planets = visible_planets(pool)
+
+    rects = []  # Dirty rect of each drawn planet
+    draw_circle = pygame.draw.circle  # Bound once for the loop
+    for color, x, y, radius in planets:
+        rects.append(draw_circle(surface, color, (x, y), radius))  # Returns the area it drew
+    return rects
+
+def circle_texture(renderer, textures, radius):
+    # White filled circle texture for a radius, rasterized once and tinted per draw
+    texture = textures.get(radius)
+    if texture is None:
+        surface = pygame.Surface((2 * radius, 2 * radius), pygame.SRCALPHA)
+        pygame.draw.circle(surface, (255, 255, 255), (radius, radius), radius)
+        texture = textures[radius] = Texture.from_surface(renderer, surface)
+    return texture
+
+def draw_circle_texture(renderer, textures, color, center, radius):
+    texture = circle_texture(renderer, textures, radius)
+    texture.color = color  # Tint the white circle
+    texture.draw(dstrect=(center[0] - radius, center[1] - radius, 2 * radius, 2 * radius))
+
+def draw_planets_textured(renderer, textures, pool):
+    # Same as draw_planets but blits cached textures through the SDL2 renderer
+    for color, x, y, radius in visible_planets(pool):
+        draw_circle_texture(renderer, textures, color, (x, y), radius)
 
 def main():
+    parser = argparse.ArgumentParser(description="Planetary Simulation")
+    parser.add_argument("--gpu", action="store_true", help="compute gravity on a CUDA GPU for large planet counts")
+    parser.add_argument("--software", action="store_true", help="draw with pygame surfaces instead of the SDL2 renderer")
+    args = parser.parse_args()
+    use_gpu = args.gpu and gpu_available()
+    if args.gpu and not use_gpu:
+        print("No CUDA GPU available, computing gravity on the CPU")
+
+    # Local bindings skip the module attribute lookups on every call
+    get_ticks = pygame.time.get_ticks
+    get_mouse = pygame.mouse.get_pos
+    draw_circle = pygame.draw.circle
+
     running = True  # Flag for simulation running
-    planets = []  # List of all planets
+    planets = planet_pool  # All planets, stored as arrays
     largest_planet = None  # Track largest planet
 
     creating_planet = False  # Flag for planet creation
@@ -174,9 +655,28 @@ def main():
     setting_velocity = False  # Flag for setting velocity
     velocity_target_pos = (0, 0)  # Target position for velocity
 
-    while running:
-        screen.fill(BG_COLOR)  # Clear screen
+    font = pygame.font.SysFont(None, 24)  # Font for instructions
+    instructions = [
+        "Left Click and Hold to Create a Planet",
+        "Release to set size, then Left Click to set initial velocity"
+    ]
+    hud_imgs = [font.render(text, True, (255, 255, 255)) for text in instructions]  # Render text once
+
+    # Set up the display
+    if Renderer is not None and not args.software:  # Hardware rendering with cached circle textures
+        window = Window("Planetary Simulation", size=(WIDTH, HEIGHT))  # Window title and size
+        renderer = Renderer(window)
+        textures = {}  # Circle texture per radius
+        hud_textures = [Texture.from_surface(renderer, img) for img in hud_imgs]
+    else:
+        renderer = None
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))  # Screen size
+        pygame.display.set_caption("Planetary Simulation")  # Window title
+
+    prev_rects = []  # Planet areas drawn last frame
+    full_redraw = True  # Repaint the whole window (first frame and after creation previews)
 
+    while running:
         for event in pygame.event.get():  # Process events
             if event.type == pygame.QUIT:  # Quit the simulation
                 running = False
@@ -184,18 +684,18 @@ def main():
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 if not creating_planet and not setting_velocity:
                     creating_planet = True  # Start creating planet
-                    creation_start_time = pygame.time.get_ticks()  # Start time for creation
-                    creation_start_pos = pygame.mouse.get_pos()  # Initial mouse position
+                    creation_start_time = get_ticks()  # Start time for creation
+                    creation_start_pos = get_mouse()  # Initial mouse position
 
             elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
                 if creating_planet:
-                    creation_duration = (pygame.time.get_ticks() - creation_start_time) / 100  # Calculate duration
+                    creation_duration = (get_ticks() - creation_start_time) / 100  # Calculate duration
                     radius = max(MIN_RADIUS, int(creation_duration))  # Set radius
                     creating_planet = False  # Stop creating planet
                     setting_velocity = True  # Start setting velocity
 
                 elif setting_velocity:
-                    velocity_target_pos = pygame.mouse.get_pos()  # Get velocity target
+                    velocity_target_pos = get_mouse()  # Get velocity target
                     setting_velocity = False  # Stop setting velocity
 
                     dx = velocity_target_pos[0] - creation_start_pos[0]  # X difference for velocity
@@ -205,92 +705,107 @@ def main():
                     vy = dy * velocity_scale  # Velocity in y direction
 
                     new_planet = Planet(creation_start_pos[0], creation_start_pos[1], radius, vx, vy)  # Create planet
-                    planets.append(new_planet)  # Add to planet list
 
-                    if largest_planet is None or new_planet.radius > largest_planet.radius:
-                        if largest_planet:  # Update largest planet flag
-                            largest_planet.is_largest = False
+                    if largest_planet is None or largest_planet.index < 0 or new_planet.radius > largest_planet.radius:
+                        if largest_planet and largest_planet.index >= 0:  # Update largest planet flag
+                            largest_planet.flags &= ~LARGEST
                         largest_planet = new_planet  # Set new largest planet
-                        largest_planet.is_largest = True
+                        largest_planet.flags |= LARGEST
 
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:  # R clears all planets
                    planets.clear()
 
                 elif event.key == pygame.K_SPACE:
-                    v_dict = {p: [p.vx, p.vy, p.ax, p.ay] for p in planets}
-                    for p in planets:
-                        p.vx = 0
-                        p.vy = 0
-                        p.ax = 0
-                        p.ay = 0
-                        
+                    n = len(planets)
+                    planets.vx[:n] = 0  # Stop every planet
+                    planets.vy[:n] = 0
+                    planets.ax[:n] = 0
+                    planets.ay[:n] = 0
 
                 elif event.key == pygame.K_p:  # 'p' creates non-collidable planet
-                    mouse_x, mouse_y = pygame.mouse.get_pos()
-                    new_planet = NonCollidingPlanet(mouse_x, mouse_y, MIN_RADIUS)
-                    planets.append(new_planet)
+                    mouse_x, mouse_y = get_mouse()
+                    NonCollidingPlanet(mouse_x, mouse_y, MIN_RADIUS)
                 
                 elif event.key == pygame.K_o:  # 'o' creates ghost planet
-                    mouse_x, mouse_y = pygame.mouse.get_pos()
-                    new_planet = GhostPlanet(mouse_x, mouse_y, MIN_RADIUS)
-                    planets.append(new_planet)
+                    mouse_x, mouse_y = get_mouse()
+                    GhostPlanet(mouse_x, mouse_y, MIN_RADIUS)
                 
                 elif event.key == pygame.K_g:
                     # Create a grid of Ghost planets
                     for x in range(0, WIDTH, 70):
                         for y in range(0, HEIGHT, 70):
-                            ghost_planet = GhostPlanet(x, y, MIN_RADIUS)
-                            planets.append(ghost_planet)
+                            GhostPlanet(x, y, MIN_RADIUS)
                 
                 elif event.key == pygame.K_s:  # 's' creates sun planet
-                    sun = Sun()
-                    planets.append(sun)
+                    Sun()
+
+        removed = planets.removed  # Reused removal mask, cleared by compact()
+        for i, j in collision_pairs(planets):  # Only compare planets in neighbouring cells
+            if planets[i].check_collision(planets[j]):  # If planets collide
+                removed[j] = True  # Mark for removal
+
+        planets.compact()  # Remove colliding planets in one pass
+
+        step_planets(planets, TIME_STEP, use_gpu)  # Apply gravity and update planet positions
 
         if creating_planet:
-            current_time = pygame.time.get_ticks()
-            creation_duration = (current_time - creation_start_time) / 100  # Calculate radius while creating
+            creation_duration = (get_ticks() - creation_start_time) / 100  # Calculate radius while creating
             current_radius = max(MIN_RADIUS, int(creation_duration))  # Current planet radius
-            pygame.draw.circle(screen, get_color_from_radius(current_radius), creation_start_pos, current_radius)  # Draw circle
-            pygame.draw.circle(screen, get_color_from_radius(current_radius), creation_start_pos, current_radius, 2)
+            current_color = get_color_from_radius(current_radius)
 
-        if setting_velocity:
-            mouse_pos = pygame.mouse.get_pos()  # Get cmurrent mouse position
-            pygame.draw.line(screen, (255, 255, 255), creation_start_pos, mouse_pos, 2)  # Draw velocity line
+        if renderer is not None:
+            renderer.draw_color = BG_COLOR
+            renderer.clear()  # Clear screen
 
-        to_remove = set()  # Set to store planets to be removed
-        for i, planet in enumerate(planets):
-            for other_planet in planets[i + 1:]:  # Compare each planet with others
-                if planet.check_collision(other_planet):  # If planets collide
-                    to_remove.add(other_planet)  # Add to removal set
+            if creating_planet:
+                draw_circle_texture(renderer, textures, current_color, creation_start_pos, current_radius)  # Draw circle
 
-        for planet in to_remove:
-            planets.remove(planet)  # Remove colliding planets
+            if setting_velocity:
+                mouse_pos = get_mouse()
+                renderer.draw_color = (255, 255, 255)
+                renderer.draw_line(creation_start_pos, mouse_pos)  # Draw velocity line
+                # Second line beside it for 2 px, offset the way pygame.draw.line thickens
+                if abs(mouse_pos[0] - creation_start_pos[0]) > abs(mouse_pos[1] - creation_start_pos[1]):
+                    renderer.draw_line((creation_start_pos[0], creation_start_pos[1] + 1), (mouse_pos[0], mouse_pos[1] + 1))
+                else:
+                    renderer.draw_line((creation_start_pos[0] + 1, creation_start_pos[1]), (mouse_pos[0] + 1, mouse_pos[1]))
 
-        for planet in planets:
-            for other_planet in planets:
-                if planet != other_planet:  # Apply gravity only to different planets
-                    planet.apply_gravity(other_planet)
+            draw_planets_textured(renderer, textures, planets)  # Draw planets on screen
 
-            # planet.apply_gravity_to_center()  # Apply gravity to the center for largest planet
+            for i, texture in enumerate(hud_textures):
+                texture.draw(dstrect=(10, 10 + i * 20))  # Display text
 
-        for planet in planets:
-            planet.update_position(TIME_STEP)  # Update planet position
+            renderer.present()  # Update screen
 
-        for planet in planets:
-            planet.draw(screen)  # Draw planet on screen
+        else:
+            full_frame = full_redraw or creating_planet or setting_velocity  # Previews need the whole window
+            if full_frame:
+                screen.fill(BG_COLOR)  # Clear screen
+            else:
+                fill = screen.fill
+                for rect in prev_rects:
+                    fill(BG_COLOR, rect)  # Only clear where planets were last frame
 
-        font = pygame.font.SysFont(None, 24)  # Font for instructions
-        instructions = [
-            "Left Click and Hold to Create a Planet",
-            "Release to set size, then Left Click to set initial velocity"
-        ]
-        
-        for i, text in enumerate(instructions):
-            img = font.render(text, True, (255, 255, 255))  # Render text
-            screen.blit(img, (10, 10 + i * 20))  # Display text
+            if creating_planet:
+                draw_circle(screen, current_color, creation_start_pos, current_radius)  # Draw circle
+                draw_circle(screen, current_color, creation_start_pos, current_radius, 2)
+
+            if setting_velocity:
+                mouse_pos = get_mouse()  # Get cmurrent mouse position
+                pygame.draw.line(screen, (255, 255, 255), creation_start_pos, mouse_pos, 2)  # Draw velocity line
+
+            curr_rects = draw_planets(screen, planets)  # Draw planets on screen
+
+            hud_rects = [screen.blit(img, (10, 10 + i * 20)) for i, img in enumerate(hud_imgs)]  # Display text
+
+            if full_frame:
+                pygame.display.flip()  # Update screen
+            else:
+                pygame.display.update(prev_rects + curr_rects + hud_rects)  # Update only what changed
+            prev_rects = curr_rects
+            full_redraw = creating_planet or setting_velocity  # Erase previews with one more full frame
 
-        pygame.display.flip()  # Update screen
         clock.tick(60)  # Limit frame rate to 60 FPS
 
     pygame.quit()  # Quit pygame
@@ -0,0 +1,68 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+# Compiled gravity kernels for planets.py, used when Numba isn't installed.
+# Build in place with: python setup.py build_ext --inplace
+import numpy as np
+from libc.math cimport sqrtf
+
+
+cpdef void compute_accel(float[::1] xs, float[::1] ys, float[::1] m,
+                         float[::1] ax, float[::1] ay, double G, int n_threads=1):
+    # Pull of every planet on every other, each pair visited once (Newton's third law).
+    # n_threads matches the Numba kernel's signature; this loop always runs on one thread.
+    cdef Py_ssize_t n = xs.shape[0]
+    cdef Py_ssize_t i, j
+    cdef float xi, yi, m_i, dx, dy, inv_r, inv_r3
+    cdef double axi, ayi  # float64 accumulators avoid cancellation in large sums
+    cdef double[::1] acc_x = np.zeros(n)
+    cdef double[::1] acc_y = np.zeros(n)
+    cdef float one = 1.0
+    cdef float eps = 1e-4  # Softening
+
+    with nogil:
+        for i in range(n):
+            xi = xs[i]
+            yi = ys[i]
+            m_i = m[i]
+            axi = 0
+            ayi = 0
+            for j in range(i + 1, n):
+                dx = xs[j] - xi
+                dy = ys[j] - yi
+                inv_r = one / sqrtf(dx * dx + dy * dy + eps)
+                inv_r3 = inv_r * inv_r * inv_r
+                axi += m[j] * dx * inv_r3  # Pull of j on i
+                ayi += m[j] * dy * inv_r3
+                acc_x[j] -= m_i * dx * inv_r3  # Equal and opposite pull of i on j
+                acc_y[j] -= m_i * dy * inv_r3
+            acc_x[i] += axi
+            acc_y[i] += ayi
+
+        for i in range(n):
+            ax[i] = <float>(G * acc_x[i])
+            ay[i] = <float>(G * acc_y[i])
+
+
+cpdef void compute_accel_from(float[::1] tx, float[::1] ty, float[::1] xs, float[::1] ys,
+                              float[::1] m, float[::1] ax, float[::1] ay, double G):
+    # Pull of the planets at xs, ys on targets that don't pull back
+    cdef Py_ssize_t i, j
+    cdef float xi, yi, dx, dy, inv_r, inv_r3
+    cdef double axi, ayi  # float64 accumulators
+    cdef float one = 1.0
+    cdef float eps = 1e-4  # Softening
+
+    with nogil:
+        for i in range(tx.shape[0]):
+            xi = tx[i]
+            yi = ty[i]
+            axi = 0
+            ayi = 0
+            for j in range(xs.shape[0]):
+                dx = xs[j] - xi
+                dy = ys[j] - yi
+                inv_r = one / sqrtf(dx * dx + dy * dy + eps)
+                inv_r3 = inv_r * inv_r * inv_r
+                axi += m[j] * dx * inv_r3
+                ayi += m[j] * dy * inv_r3
+            ax[i] = <float>(G * axi)  # Store once per planet
+            ay[i] = <float>(G * ayi)
@@ -0,0 +1,8 @@
+# Builds the optional compiled gravity kernels: python setup.py build_ext --inplace
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    name="planetsGame",
+    ext_modules=cythonize(["planets_kernel.pyx"]),
+)